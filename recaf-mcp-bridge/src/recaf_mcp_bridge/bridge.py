@@ -1,135 +1,525 @@
 """Stdio-to-HTTP MCP bridge for Recaf MCP Server."""
 
+import argparse
 import asyncio
+import contextlib
+import logging
+import logging.handlers
+import math
+import os
+import queue
 import sys
 import time
-from typing import Any
+from datetime import timedelta
+from collections.abc import AsyncIterator, Awaitable, Callable
+from io import TextIOWrapper
+from typing import Any, TextIO
 
+import httpx
+import jsonschema
 from mcp.server import Server
+from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
-from mcp.client.streamable_http import streamablehttp_client
+from mcp.client.streamable_http import streamable_http_client
 from mcp import ClientSession
+from mcp.shared.exceptions import McpError
 from mcp.types import (
+    CallToolResult,
     Tool,
     Resource,
     TextContent,
     ImageContent,
     EmbeddedResource,
+    ListResourcesResult,
+    ListToolsResult,
+    ServerNotification,
+    ToolListChangedNotification,
+    ResourceListChangedNotification,
 )
 
+logger = logging.getLogger(__name__)
+
+_DEFAULT_METADATA_CACHE_TTL_SECONDS = 600.0
+_BACKEND_TIMEOUT_SECONDS = 300.0
+_BACKEND_MAX_KEEPALIVE_CONNECTIONS = 4
+_BACKEND_KEEPALIVE_EXPIRY_SECONDS = 60.0
+_RECONNECT_BACKOFF_INITIAL_SECONDS = 1.0
+_RECONNECT_BACKOFF_MAX_SECONDS = 30.0
+_DISPATCH_CONCURRENCY = 8
+# Error code mcp's streamable HTTP client reports when the server no longer knows the session.
+_SESSION_TERMINATED_ERROR_CODE = 32600
+
+
+class _StdoutFrameWriter:
+    """Stdout adapter for ``stdio_server`` that writes and flushes each frame in one thread hop.
+
+    ``stdio_server`` is annotated to take an ``anyio.AsyncFile[str]`` but only awaits
+    ``write()`` and ``flush()`` on it, so this duck-types those two methods rather than
+    subclassing ``AsyncFile``, whose methods each take their own thread hop.
+    """
+
+    __slots__ = ("_stream",)
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+
+    def _write_and_flush(self, data: str):
+        self._stream.write(data)
+        self._stream.flush()
+
+    async def write(self, data: str):
+        await asyncio.to_thread(self._write_and_flush, data)
+
+    async def flush(self):
+        # Already flushed by write(); keep the transport's cancellation checkpoint.
+        await asyncio.sleep(0)
+
 
 class RecafMcpBridge:
     """MCP Server that bridges stdio to Recaf's Streamable HTTP endpoint."""
 
-    def __init__(self, host: str = "localhost", port: int = 8085):
+    __slots__ = (
+        "port",
+        "host",
+        "url",
+        "server",
+        "backend",
+        "_reconnect",
+        "_metadata_cache_ttl_ns",
+        "_tools_cache",
+        "_tools_cache_expires_ns",
+        "_resources_cache",
+        "_resources_cache_expires_ns",
+        "_tools_inflight",
+        "_resources_inflight",
+        "_init_options",
+        "_backend_lost",
+        "_backend_tasks",
+        "_dispatch_slots",
+        "_tools_response",
+        "_resources_response",
+        "_tools_by_name",
+        "_tool_input_validators",
+    )
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8085,
+        reconnect: bool = False,
+        metadata_cache_ttl: float = _DEFAULT_METADATA_CACHE_TTL_SECONDS,
+    ):
+        if not math.isfinite(metadata_cache_ttl) or metadata_cache_ttl < 0:
+            raise ValueError("metadata_cache_ttl must be a finite number >= 0")
         self.port = port
         self.host = host
+        self._reconnect = reconnect
         self.url = f"http://{host}:{port}/mcp"
         self.server = Server("recaf-mcp-bridge")
         self.backend: ClientSession | None = None
-        self._metadata_cache_ttl_seconds = 30.0
-        self._tools_cache: list[Tool] | None = None
-        self._tools_cache_at = 0.0
-        self._resources_cache: list[Resource] | None = None
-        self._resources_cache_at = 0.0
+        self._metadata_cache_ttl_ns = int(metadata_cache_ttl * 1_000_000_000)
+        self._tools_cache: tuple[Tool, ...] | None = None
+        self._tools_cache_expires_ns = 0
+        self._resources_cache: tuple[Resource, ...] | None = None
+        self._resources_cache_expires_ns = 0
+        self._tools_inflight: asyncio.Task[tuple[Tool, ...]] | None = None
+        self._resources_inflight: asyncio.Task[tuple[Resource, ...]] | None = None
+        self._init_options: InitializationOptions | None = None
+        self._backend_lost: asyncio.Event | None = None
+        self._backend_tasks: set[asyncio.Future[Any]] = set()
+        self._dispatch_slots = asyncio.Semaphore(_DISPATCH_CONCURRENCY)
+        self._tools_response: tuple[tuple[Tool, ...], ListToolsResult] | None = None
+        self._resources_response: tuple[tuple[Resource, ...], ListResourcesResult] | None = None
+        self._tools_by_name: dict[str, Tool] = {}
+        self._tool_input_validators: dict[str, tuple[Tool, jsonschema.protocols.Validator]] = {}
         self._register_handlers()
 
-    def _cache_valid(self, cache_at: float) -> bool:
-        return cache_at > 0 and (time.monotonic() - cache_at) < self._metadata_cache_ttl_seconds
-
-    def _clear_metadata_cache(self):
+    def _invalidate_tools_cache(self):
         self._tools_cache = None
-        self._tools_cache_at = 0.0
+        self._tools_cache_expires_ns = 0
+        self._tools_inflight = None
+        self._tools_response = None
+
+    def _invalidate_resources_cache(self):
         self._resources_cache = None
-        self._resources_cache_at = 0.0
+        self._resources_cache_expires_ns = 0
+        self._resources_inflight = None
+        self._resources_response = None
+
+    def _clear_metadata_cache(self):
+        self._invalidate_tools_cache()
+        self._invalidate_resources_cache()
+
+    async def _handle_backend_message(self, message: Any):
+        if isinstance(message, Exception):
+            # Per-message errors (a malformed frame, a late response) leave the session usable;
+            # losing the transport surfaces from the session's task group instead.
+            logger.warning("Recaf MCP backend message error: %r", message)
+            return
+        # The TTL is only a safety net; list_changed notifications drive freshness.
+        if not isinstance(message, ServerNotification):
+            return
+        if isinstance(message.root, ToolListChangedNotification):
+            self._invalidate_tools_cache()
+        elif isinstance(message.root, ResourceListChangedNotification):
+            self._invalidate_resources_cache()
 
     def _set_backend(self, backend: ClientSession | None):
         if backend is not self.backend:
+            # The SDK tears a dropped session down before failing its pending requests, so
+            # calls still waiting on the old session would sit out the read timeout.
+            for task in tuple(self._backend_tasks):
+                task.cancel()
             self._clear_metadata_cache()
+            # Unlike the list caches, tool definitions outlive list_changed until relisted,
+            # but they belong to one backend.
+            self._tools_by_name = {}
+            self._tool_input_validators = {}
         self.backend = backend
 
-    async def _list_tools(self) -> list[Tool]:
-        if not self.backend:
+    def _note_backend_error(self, exc: McpError, backend_lost: asyncio.Event | None):
+        # A 404 for an unknown session (Recaf restarted) arrives as a per-request error while
+        # the transport stays up; end the session so the reconnect loop starts a new one.
+        if backend_lost is None or exc.error.code != _SESSION_TERMINATED_ERROR_CODE:
+            return
+        if not backend_lost.is_set():
+            logger.warning("Recaf MCP session terminated by the server")
+            backend_lost.set()
+
+    def _track_backend_task(self, task: asyncio.Future[Any]):
+        self._backend_tasks.add(task)
+        task.add_done_callback(self._backend_tasks.discard)
+
+    def _require_backend(self) -> ClientSession:
+        backend = self.backend
+        if backend is None:
             raise RuntimeError("Backend not connected")
-        if self._tools_cache is not None and self._cache_valid(self._tools_cache_at):
+        return backend
+
+    async def _list_tools(self) -> tuple[Tool, ...]:
+        backend = self._require_backend()
+        if self._tools_cache is not None and time.monotonic_ns() < self._tools_cache_expires_ns:
             return self._tools_cache
-        result = await self.backend.list_tools()
-        self._tools_cache = result.tools
-        self._tools_cache_at = time.monotonic()
-        return result.tools
+        task = self._tools_inflight
+        if task is None:
+            # The fetch runs in its own task so a cancelled caller never cancels it for the others.
+            task = asyncio.ensure_future(self._fetch_tools(backend))
+            task.add_done_callback(_retrieve_exception)
+            self._track_backend_task(task)
+            self._tools_inflight = task
+        return await _await_backend_task(task, shield=True)
 
-    async def _list_resources(self) -> list[Resource]:
-        if not self.backend:
-            raise RuntimeError("Backend not connected")
-        if self._resources_cache is not None and self._cache_valid(self._resources_cache_at):
+    async def _fetch_tools(self, backend: ClientSession) -> tuple[Tool, ...]:
+        task = asyncio.current_task()
+        backend_lost = self._backend_lost
+        try:
+            result = await backend.list_tools()
+            # Published as a tuple so callers can share the cached list without copying it.
+            tools = tuple(result.tools)
+            # A reconnect while the fetch was in flight clears the slot; don't cache stale metadata.
+            if self._tools_inflight is task:
+                self._tools_cache = tools
+                self._tools_cache_expires_ns = time.monotonic_ns() + self._metadata_cache_ttl_ns
+                self._tools_by_name = {tool.name: tool for tool in tools}
+            return tools
+        except McpError as exc:
+            self._note_backend_error(exc, backend_lost)
+            raise
+        finally:
+            if self._tools_inflight is task:
+                self._tools_inflight = None
+
+    async def _list_resources(self) -> tuple[Resource, ...]:
+        backend = self._require_backend()
+        if self._resources_cache is not None and time.monotonic_ns() < self._resources_cache_expires_ns:
             return self._resources_cache
-        result = await self.backend.list_resources()
-        self._resources_cache = result.resources
-        self._resources_cache_at = time.monotonic()
-        return result.resources
+        task = self._resources_inflight
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_resources(backend))
+            task.add_done_callback(_retrieve_exception)
+            self._track_backend_task(task)
+            self._resources_inflight = task
+        return await _await_backend_task(task, shield=True)
+
+    async def _fetch_resources(self, backend: ClientSession) -> tuple[Resource, ...]:
+        task = asyncio.current_task()
+        backend_lost = self._backend_lost
+        try:
+            result = await backend.list_resources()
+            resources = tuple(result.resources)
+            if self._resources_inflight is task:
+                self._resources_cache = resources
+                self._resources_cache_expires_ns = time.monotonic_ns() + self._metadata_cache_ttl_ns
+            return resources
+        except McpError as exc:
+            self._note_backend_error(exc, backend_lost)
+            raise
+        finally:
+            if self._resources_inflight is task:
+                self._resources_inflight = None
+
+    async def _dispatch(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        # Runs in the caller's task so a cancelled request also cancels its backend call;
+        # a burst waits here instead of piling onto the backend. The lost event is captured
+        # up front so a late error from an old session can't end its replacement.
+        backend_lost = self._backend_lost
+        async with self._dispatch_slots:
+            # Awaiting the call's own task still forwards the caller's cancellation to it.
+            call = asyncio.ensure_future(fn(*args))
+            self._track_backend_task(call)
+            try:
+                return await _await_backend_task(call)
+            except McpError as exc:
+                self._note_backend_error(exc, backend_lost)
+                raise
+
+    def _tool_input_validator(self, name: str) -> jsonschema.protocols.Validator | None:
+        # The SDK's call_tool wrapper has already resolved the name (refetching on a miss),
+        # so the last listed definitions are current.
+        tool = self._tools_by_name.get(name)
+        if tool is None:
+            return None
+        cached = self._tool_input_validators.get(name)
+        # Compile once per Tool object; a relisted tool with a new definition gets a new validator.
+        if cached is None or cached[0] is not tool:
+            cached = (tool, _compile_validator(tool.inputSchema))
+            self._tool_input_validators[name] = cached
+        return cached[1]
 
     def _register_handlers(self):
+        # Build each result model from the cached tuple once and reuse it while the tuple
+        # is unchanged; the SDK accepts a prebuilt result and keeps its own tool cache.
         @self.server.list_tools()
-        async def list_tools() -> list[Tool]:
-            return await self._list_tools()
+        async def list_tools() -> ListToolsResult:
+            tools = await self._list_tools()
+            cached = self._tools_response
+            if cached is not None and cached[0] is tools:
+                return cached[1]
+            result = ListToolsResult(tools=list(tools))
+            self._tools_response = (tools, result)
+            return result
 
-        @self.server.call_tool()
+        @self.server.list_resources()
+        async def list_resources() -> ListResourcesResult:
+            resources = await self._list_resources()
+            cached = self._resources_response
+            if cached is not None and cached[0] is resources:
+                return cached[1]
+            result = ListResourcesResult(resources=list(resources))
+            self._resources_response = (resources, result)
+            return result
+
+        # Input is validated here against cached compiled validators; the SDK's own
+        # validation re-checks the schema and builds a new validator on every call.
+        @self.server.call_tool(validate_input=False)
         async def call_tool(
             name: str, arguments: dict[str, Any]
-        ) -> list[TextContent | ImageContent | EmbeddedResource]:
-            if not self.backend:
-                raise RuntimeError("Backend not connected")
-            result = await self.backend.call_tool(name, arguments)
+        ) -> list[TextContent | ImageContent | EmbeddedResource] | CallToolResult:
+            backend = self._require_backend()
+            validator = self._tool_input_validator(name)
+            if validator is not None:
+                error = jsonschema.exceptions.best_match(validator.iter_errors(arguments))
+                if error is not None:
+                    return CallToolResult(
+                        content=[
+                            TextContent(type="text", text=f"Input validation error: {error.message}")
+                        ],
+                        isError=True,
+                    )
+            result = await self._dispatch(backend.call_tool, name, arguments)
             return result.content
 
-        @self.server.list_resources()
-        async def list_resources() -> list[Resource]:
-            return await self._list_resources()
-
         @self.server.read_resource()
         async def read_resource(uri: str) -> str | bytes:
-            if not self.backend:
-                raise RuntimeError("Backend not connected")
-            result = await self.backend.read_resource(uri)
+            backend = self._require_backend()
+            result = await self._dispatch(backend.read_resource, uri)
             if result.contents and len(result.contents) > 0:
                 content = result.contents[0]
-                if hasattr(content, "text") and content.text:
-                    return content.text
-                if hasattr(content, "blob") and content.blob:
-                    return content.blob
+                text = getattr(content, "text", None)
+                if text:
+                    return text
+                blob = getattr(content, "blob", None)
+                if blob:
+                    return blob
             return ""
 
-    async def run(self):
-        print(f"Connecting to Recaf MCP at {self.url}...", file=sys.stderr)
-        async with streamablehttp_client(
-            self.url, timeout=300.0
-        ) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(_BACKEND_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_keepalive_connections=_BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=_BACKEND_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    @contextlib.asynccontextmanager
+    async def _connect_backend(self, http_client: httpx.AsyncClient) -> AsyncIterator[ClientSession]:
+        logger.info("Connecting to Recaf MCP at %s...", self.url)
+        async with streamable_http_client(self.url, http_client=http_client) as (
+            read_stream,
+            write_stream,
+            _,
+        ):
+            # Bound reads so calls pending on a session that dies mid-request fail instead of hanging.
+            async with ClientSession(
+                read_stream,
+                write_stream,
+                read_timeout_seconds=timedelta(seconds=_BACKEND_TIMEOUT_SECONDS),
+                message_handler=self._handle_backend_message,
+            ) as session:
+                init = await session.initialize()
+                logger.info("Connected to %s v%s", init.serverInfo.name, init.serverInfo.version)
+                # Only an initialized session is handed to stdio requests; one sent before
+                # initialize has no session id and its 4xx would tear the connection down.
                 self._set_backend(session)
                 try:
-                    init = await session.initialize()
-                    print(
-                        f"Connected to {init.serverInfo.name} v{init.serverInfo.version}",
-                        file=sys.stderr,
+                    # Warm both metadata caches while stdio starts up; first client calls join the fetch.
+                    prefetch = asyncio.gather(
+                        self._list_tools(), self._list_resources(), return_exceptions=True
                     )
-                    async with stdio_server() as (read_s, write_s):
-                        await self.server.run(
-                            read_s, write_s, self.server.create_initialization_options()
-                        )
+                    try:
+                        yield session
+                    finally:
+                        # Await the cancelled gather so its CancelledError is retrieved.
+                        prefetch.cancel()
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await prefetch
                 finally:
                     self._set_backend(None)
 
+    async def _maintain_backend(self, http_client: httpx.AsyncClient):
+        backoff = _RECONNECT_BACKOFF_INITIAL_SECONDS
+        while True:
+            self._backend_lost = asyncio.Event()
+            try:
+                async with self._connect_backend(http_client):
+                    backoff = _RECONNECT_BACKOFF_INITIAL_SECONDS
+                    # A dropped transport fails the connection's task group and cancels this wait;
+                    # a session the server no longer knows is reported by _note_backend_error.
+                    await self._backend_lost.wait()
+            except Exception as exc:
+                # A task group torn down while we are being cancelled raises its errors in
+                # place of the CancelledError; don't let that turn shutdown into a reconnect.
+                if asyncio.current_task().cancelling():
+                    raise asyncio.CancelledError from exc
+                # Transport failures surface as httpx errors or task-group exception groups.
+                logger.warning("Recaf MCP connection failed: %r", exc)
+            logger.info("Reconnecting in %gs...", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _RECONNECT_BACKOFF_MAX_SECONDS)
+
+    async def _serve_stdio(self):
+        stdout = _StdoutFrameWriter(TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+        async with stdio_server(stdout=stdout) as (read_s, write_s):
+            await self.server.run(read_s, write_s, self._init_options)
+
+    async def run(self):
+        if self._init_options is None:
+            self._init_options = self.server.create_initialization_options()
+        async with self._create_http_client() as http_client:
+            if not self._reconnect:
+                async with self._connect_backend(http_client):
+                    await self._serve_stdio()
+                return
+
+            maintainer = asyncio.create_task(self._maintain_backend(http_client))
+            try:
+                # Serve stdio right away so a client never waits on Recaf coming up; requests
+                # made before the first connection fail with "Backend not connected".
+                await self._serve_stdio()
+            finally:
+                maintainer.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await maintainer
+
+
+async def _await_backend_task(task: asyncio.Future[Any], *, shield: bool = False) -> Any:
+    try:
+        return await (asyncio.shield(task) if shield else task)
+    except asyncio.CancelledError:
+        # Cancelled by _set_backend because its connection went away, not by our caller.
+        if task.cancelled() and not asyncio.current_task().cancelling():
+            raise RuntimeError("Backend connection lost") from None
+        raise
+
+
+def _retrieve_exception(task: asyncio.Task[Any]):
+    # Every caller of a shared fetch may have been cancelled; mark its failure as handled.
+    if not task.cancelled():
+        task.exception()
+
+
+def _compile_validator(schema: dict[str, Any]) -> jsonschema.protocols.Validator:
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def _event_loop_factory() -> Callable[[], asyncio.AbstractEventLoop] | None:
+    # uvloop is an optional speedup; fall back to the default asyncio loop without it.
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
+def _start_logging() -> logging.handlers.QueueListener:
+    # stdout carries the MCP stream, so logs go to stderr from a listener thread
+    # and a slow stderr consumer never blocks the event loop.
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, stderr_handler)
+    listener.start()
+    return listener
+
+
+_PARSER = argparse.ArgumentParser(description="Recaf MCP stdio bridge")
+_PARSER.add_argument("--host", type=str, default="localhost", help="Recaf MCP host")
+_PARSER.add_argument("--port", type=int, default=8085, help="Recaf MCP port")
+_PARSER.add_argument(
+    "--metadata-cache-ttl",
+    type=float,
+    default=None,
+    help="Seconds to cache tools/resources metadata, 0 disables "
+    f"(default: $RECAF_MCP_METADATA_TTL or {_DEFAULT_METADATA_CACHE_TTL_SECONDS:g})",
+)
+
 
 def main():
-    import argparse
+    args = _PARSER.parse_args()
 
-    parser = argparse.ArgumentParser(description="Recaf MCP stdio bridge")
-    parser.add_argument("--host", type=str, default="localhost", help="Recaf MCP host")
-    parser.add_argument("--port", type=int, default=8085, help="Recaf MCP port")
-    args = parser.parse_args()
+    metadata_cache_ttl = args.metadata_cache_ttl
+    if metadata_cache_ttl is None:
+        env_ttl = os.environ.get("RECAF_MCP_METADATA_TTL")
+        try:
+            metadata_cache_ttl = (
+                float(env_ttl) if env_ttl else _DEFAULT_METADATA_CACHE_TTL_SECONDS
+            )
+        except ValueError:
+            _PARSER.error(f"RECAF_MCP_METADATA_TTL must be a number, got {env_ttl!r}")
+    if not math.isfinite(metadata_cache_ttl) or metadata_cache_ttl < 0:
+        _PARSER.error("metadata cache TTL must be a finite number >= 0")
 
-    bridge = RecafMcpBridge(host=args.host, port=args.port)
-    asyncio.run(bridge.run())
+    reconnect = os.environ.get("RECAF_MCP_RECONNECT", "") == "1"
+    bridge = RecafMcpBridge(
+        host=args.host,
+        port=args.port,
+        reconnect=reconnect,
+        metadata_cache_ttl=metadata_cache_ttl,
+    )
+    listener = _start_logging()
+    try:
+        with asyncio.Runner(loop_factory=_event_loop_factory()) as runner:
+            runner.run(bridge.run())
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+import pytest
+
+from recaf_mcp_bridge.bridge import RecafMcpBridge
+
+
+@pytest.fixture
+def bridge() -> RecafMcpBridge:
+    return RecafMcpBridge()
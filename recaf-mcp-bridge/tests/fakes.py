@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from mcp.types import TextContent, Tool
+
+TOOL_A = Tool(name="tool-a", inputSchema={"type": "object"})
+TOOL_B = Tool(name="tool-b", inputSchema={"type": "object"})
+
+
+class FakeBackend:
+    def __init__(self, *, tools: list[Tool], resources: list[str]):
+        self._tools = tools
+        self._resources = resources
+        self.list_tools_calls = 0
+        self.list_resources_calls = 0
+        self.tool_calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def initialize(self):
+        return SimpleNamespace(serverInfo=SimpleNamespace(name="recaf-mcp", version="test"))
+
+    async def list_tools(self):
+        self.list_tools_calls += 1
+        await self.release.wait()
+        return SimpleNamespace(tools=self._tools)
+
+    async def list_resources(self):
+        self.list_resources_calls += 1
+        await self.release.wait()
+        return SimpleNamespace(resources=self._resources)
+
+    async def call_tool(self, name, arguments):
+        self.tool_calls.append((name, arguments))
+        return SimpleNamespace(content=[TextContent(type="text", text=f"called {name}")])
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import pytest
+from mcp.types import (
+    CallToolRequest,
+    CallToolRequestParams,
+    ListToolsRequest,
+    ServerNotification,
+    Tool,
+    ToolListChangedNotification,
+)
+
+from fakes import FakeBackend
+from recaf_mcp_bridge import bridge as bridge_module
+from recaf_mcp_bridge.bridge import RecafMcpBridge
+
+
+@pytest.mark.asyncio
+async def test_call_tool_validates_input_with_cached_validator(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    tool = Tool(
+        name="decompile-class",
+        inputSchema={
+            "type": "object",
+            "properties": {"className": {"type": "string"}},
+            "required": ["className"],
+        },
+    )
+    backend = FakeBackend(tools=[tool], resources=[])
+    bridge._set_backend(backend)
+
+    compiled = []
+    real_compile = bridge_module._compile_validator
+
+    def counting_compile(schema):
+        compiled.append(schema)
+        return real_compile(schema)
+
+    monkeypatch.setattr(bridge_module, "_compile_validator", counting_compile)
+    call_tool = bridge.server.request_handlers[CallToolRequest]
+
+    def request(arguments):
+        params = CallToolRequestParams(name="decompile-class", arguments=arguments)
+        return CallToolRequest(method="tools/call", params=params)
+
+    invalid = await call_tool(request({}))
+    assert invalid.root.isError
+    assert "Input validation error" in invalid.root.content[0].text
+
+    for class_name in ("a/B", "c/D"):
+        result = await call_tool(request({"className": class_name}))
+        assert not result.root.isError
+        assert result.root.content[0].text == "called decompile-class"
+
+    assert backend.tool_calls == [
+        ("decompile-class", {"className": "a/B"}),
+        ("decompile-class", {"className": "c/D"}),
+    ]
+    assert len(compiled) == 1
+
+
+@pytest.mark.asyncio
+async def test_tool_input_validators_follow_listed_tool_definitions(bridge: RecafMcpBridge):
+    tool = Tool(name="class-list", inputSchema={"type": "object"})
+    backend = FakeBackend(tools=[tool], resources=[])
+    bridge._set_backend(backend)
+
+    call_tool = bridge.server.request_handlers[CallToolRequest]
+    list_tools = bridge.server.request_handlers[ListToolsRequest]
+
+    async def call(arguments):
+        params = CallToolRequestParams(name="class-list", arguments=arguments)
+        return await call_tool(CallToolRequest(method="tools/call", params=params))
+
+    assert not (await call({})).root.isError
+    first = bridge._tool_input_validators["class-list"]
+    assert first[0] is tool
+
+    # A relisted definition gets its own validator.
+    strict = Tool(
+        name="class-list",
+        inputSchema={"type": "object", "required": ["packageName"]},
+    )
+    backend._tools = [strict]
+    await bridge._handle_backend_message(ServerNotification(ToolListChangedNotification()))
+    await list_tools(ListToolsRequest(method="tools/list"))
+    assert (await call({})).root.isError
+    assert bridge._tool_input_validators["class-list"][0] is strict
+
+    # Definitions and validators belong to one backend.
+    bridge._set_backend(FakeBackend(tools=[tool], resources=[]))
+    assert bridge._tools_by_name == {}
+    assert bridge._tool_input_validators == {}
+
+
+@pytest.mark.asyncio
+async def test_call_tool_validation_does_not_refetch_tools(monkeypatch: pytest.MonkeyPatch):
+    bridge = RecafMcpBridge(metadata_cache_ttl=0)
+    tool = Tool(name="class-list", inputSchema={"type": "object"})
+    backend = FakeBackend(tools=[tool], resources=[])
+    bridge._set_backend(backend)
+
+    compiled = []
+    real_compile = bridge_module._compile_validator
+
+    def counting_compile(schema):
+        compiled.append(schema)
+        return real_compile(schema)
+
+    monkeypatch.setattr(bridge_module, "_compile_validator", counting_compile)
+    call_tool = bridge.server.request_handlers[CallToolRequest]
+    params = CallToolRequestParams(name="class-list", arguments={})
+
+    for _ in range(3):
+        result = await call_tool(CallToolRequest(method="tools/call", params=params))
+        assert not result.root.isError
+
+    assert backend.list_tools_calls == 1
+    assert len(backend.tool_calls) == 3
+    assert len(compiled) == 1
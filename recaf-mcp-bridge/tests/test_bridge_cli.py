@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from recaf_mcp_bridge import bridge as bridge_module
+
+
+@pytest.mark.parametrize("ttl", ["-1", "inf", "nan"])
+def test_main_rejects_invalid_metadata_cache_ttl(ttl, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sys, "argv", ["recaf-mcp-bridge", "--metadata-cache-ttl", ttl])
+    with pytest.raises(SystemExit) as excinfo:
+        bridge_module.main()
+    assert excinfo.value.code == 2
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from recaf_mcp_bridge import bridge as bridge_module
+from recaf_mcp_bridge.bridge import RecafMcpBridge
+
+
+@pytest.mark.asyncio
+async def test_dispatch_bounds_concurrent_backend_calls(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(bridge_module, "_DISPATCH_CONCURRENCY", 2)
+    bridge = RecafMcpBridge()
+
+    active = 0
+    peak = 0
+
+    async def backend_call(value):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0)
+        active -= 1
+        if value == 3:
+            raise ValueError("bad call")
+        return value
+
+    results = await asyncio.gather(
+        *(bridge._dispatch(backend_call, i) for i in range(10)), return_exceptions=True
+    )
+
+    assert peak == 2
+    assert isinstance(results[3], ValueError)
+    assert [r for i, r in enumerate(results) if i != 3] == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_dispatch_cancels_backend_call(bridge: RecafMcpBridge):
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def backend_call():
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(bridge._dispatch(backend_call))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert cancelled.is_set()
+    # The slot is released, so later calls are not starved.
+    assert not bridge._dispatch_slots.locked()
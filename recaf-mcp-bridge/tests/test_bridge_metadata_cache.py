@@ -1,80 +1,322 @@
 from __future__ import annotations
 
-from types import SimpleNamespace
+import asyncio
+import contextlib
+import gc
+import logging
 
 import pytest
+from mcp.types import (
+    ListResourcesRequest,
+    ListToolsRequest,
+    Resource,
+    ResourceListChangedNotification,
+    ServerNotification,
+    Tool,
+    ToolListChangedNotification,
+)
 
+from fakes import FakeBackend, TOOL_A, TOOL_B
 from recaf_mcp_bridge.bridge import RecafMcpBridge
 
 
-class FakeBackend:
-    def __init__(self, *, tools: list[str], resources: list[str]):
-        self._tools = tools
-        self._resources = resources
-        self.list_tools_calls = 0
-        self.list_resources_calls = 0
+@pytest.mark.asyncio
+async def test_list_tools_uses_ttl_cache(bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch):
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
+    bridge._set_backend(backend)
+
+    now = 100_000_000_000
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: now)
 
-    async def list_tools(self):
-        self.list_tools_calls += 1
-        return SimpleNamespace(tools=self._tools)
+    first = await bridge._list_tools()
+    second = await bridge._list_tools()
 
-    async def list_resources(self):
-        self.list_resources_calls += 1
-        return SimpleNamespace(resources=self._resources)
+    assert first == (TOOL_A,)
+    assert second is first
+    assert backend.list_tools_calls == 1
 
 
 @pytest.mark.asyncio
-async def test_list_tools_uses_ttl_cache(monkeypatch: pytest.MonkeyPatch):
-    bridge = RecafMcpBridge()
-    backend = FakeBackend(tools=["tool-a"], resources=[])
+async def test_list_tools_refetches_after_ttl_expires(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
     bridge._set_backend(backend)
 
-    now = 100.0
-    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic", lambda: now)
+    clock = {"now": 100_000_000_000}
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: clock["now"])
 
-    first = await bridge._list_tools()
-    second = await bridge._list_tools()
-
-    assert first == ["tool-a"]
-    assert second == ["tool-a"]
+    await bridge._list_tools()
+    clock["now"] += bridge._metadata_cache_ttl_ns - 1
+    await bridge._list_tools()
     assert backend.list_tools_calls == 1
 
+    clock["now"] += 1
+    await bridge._list_tools()
+    assert backend.list_tools_calls == 2
+
 
 @pytest.mark.asyncio
-async def test_list_resources_uses_ttl_cache(monkeypatch: pytest.MonkeyPatch):
-    bridge = RecafMcpBridge()
+async def test_list_resources_uses_ttl_cache(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
     backend = FakeBackend(tools=[], resources=["recaf://classes"])
     bridge._set_backend(backend)
 
-    now = 200.0
-    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic", lambda: now)
+    now = 200_000_000_000
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: now)
 
     first = await bridge._list_resources()
     second = await bridge._list_resources()
 
-    assert first == ["recaf://classes"]
-    assert second == ["recaf://classes"]
+    assert first == ("recaf://classes",)
+    assert second == ("recaf://classes",)
     assert backend.list_resources_calls == 1
 
 
 @pytest.mark.asyncio
-async def test_backend_reconnect_clears_metadata_cache(monkeypatch: pytest.MonkeyPatch):
-    bridge = RecafMcpBridge()
+async def test_backend_reconnect_clears_metadata_cache(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
 
-    now = 300.0
-    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic", lambda: now)
+    now = 300_000_000_000
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: now)
 
-    backend_one = FakeBackend(tools=["tool-a"], resources=["res-a"])
+    backend_one = FakeBackend(tools=[TOOL_A], resources=["res-a"])
     bridge._set_backend(backend_one)
-    assert await bridge._list_tools() == ["tool-a"]
-    assert await bridge._list_resources() == ["res-a"]
+    assert await bridge._list_tools() == (TOOL_A,)
+    assert await bridge._list_resources() == ("res-a",)
 
-    backend_two = FakeBackend(tools=["tool-b"], resources=["res-b"])
+    backend_two = FakeBackend(tools=[TOOL_B], resources=["res-b"])
     bridge._set_backend(backend_two)
 
-    assert await bridge._list_tools() == ["tool-b"]
-    assert await bridge._list_resources() == ["res-b"]
+    assert await bridge._list_tools() == (TOOL_B,)
+    assert await bridge._list_resources() == ("res-b",)
     assert backend_one.list_tools_calls == 1
     assert backend_one.list_resources_calls == 1
     assert backend_two.list_tools_calls == 1
     assert backend_two.list_resources_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_list_calls_share_one_backend_fetch(bridge: RecafMcpBridge):
+    backend = FakeBackend(tools=[TOOL_A], resources=["res-a"])
+    backend.release.clear()
+    bridge._set_backend(backend)
+
+    tools = asyncio.gather(*(bridge._list_tools() for _ in range(5)))
+    resources = asyncio.gather(*(bridge._list_resources() for _ in range(5)))
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await tools == [(TOOL_A,)] * 5
+    assert await resources == [("res-a",)] * 5
+    assert backend.list_tools_calls == 1
+    assert backend.list_resources_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_first_caller_does_not_cancel_shared_fetch(bridge: RecafMcpBridge):
+    backend = FakeBackend(tools=[TOOL_A], resources=["res-a"])
+    backend.release.clear()
+    bridge._set_backend(backend)
+
+    first_tools = asyncio.create_task(bridge._list_tools())
+    first_resources = asyncio.create_task(bridge._list_resources())
+    await asyncio.sleep(0)
+    second_tools = asyncio.create_task(bridge._list_tools())
+    second_resources = asyncio.create_task(bridge._list_resources())
+    await asyncio.sleep(0)
+
+    first_tools.cancel()
+    first_resources.cancel()
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    assert await second_tools == (TOOL_A,)
+    assert await second_resources == ("res-a",)
+    assert first_tools.cancelled()
+    assert first_resources.cancelled()
+    assert backend.list_tools_calls == 1
+    assert backend.list_resources_calls == 1
+    assert await bridge._list_tools() == (TOOL_A,)
+    assert backend.list_tools_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_list_calls_share_backend_failure(bridge: RecafMcpBridge):
+    backend = FakeBackend(tools=[], resources=[])
+    backend.release.clear()
+
+    async def failing_list_tools():
+        backend.list_tools_calls += 1
+        await backend.release.wait()
+        raise ConnectionError("backend gone")
+
+    backend.list_tools = failing_list_tools
+    bridge._set_backend(backend)
+
+    calls = asyncio.gather(*(bridge._list_tools() for _ in range(3)), return_exceptions=True)
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    results = await calls
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert backend.list_tools_calls == 1
+    assert bridge._tools_cache is None
+
+
+@pytest.mark.asyncio
+async def test_list_changed_notifications_invalidate_metadata_cache(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    backend = FakeBackend(tools=[TOOL_A], resources=["res-a"])
+    bridge._set_backend(backend)
+
+    now = 400_000_000_000
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: now)
+
+    await bridge._list_tools()
+    await bridge._list_resources()
+
+    await bridge._handle_backend_message(ServerNotification(ToolListChangedNotification()))
+    await bridge._list_tools()
+    await bridge._list_resources()
+    assert backend.list_tools_calls == 2
+    assert backend.list_resources_calls == 1
+
+    await bridge._handle_backend_message(ServerNotification(ResourceListChangedNotification()))
+    await bridge._list_tools()
+    await bridge._list_resources()
+    assert backend.list_tools_calls == 2
+    assert backend.list_resources_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_connect_prefetches_tools_and_resources(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    backend = FakeBackend(tools=[TOOL_A], resources=["res-a"])
+
+    @contextlib.asynccontextmanager
+    async def fake_transport(_url, **_kwargs):
+        yield None, None, None
+
+    @contextlib.asynccontextmanager
+    async def fake_session(*_args, **_kwargs):
+        yield backend
+
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.streamable_http_client", fake_transport)
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.ClientSession", fake_session)
+
+    async with bridge._connect_backend(None):
+        await asyncio.sleep(0)
+        assert await bridge._list_tools() == (TOOL_A,)
+        assert await bridge._list_resources() == ("res-a",)
+
+    assert backend.list_tools_calls == 1
+    assert backend.list_resources_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_connect_closed_mid_prefetch_leaves_no_unretrieved_errors(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    backend = FakeBackend(tools=[TOOL_A], resources=["res-a"])
+    backend.release.clear()
+
+    @contextlib.asynccontextmanager
+    async def fake_transport(_url, **_kwargs):
+        yield None, None, None
+
+    @contextlib.asynccontextmanager
+    async def fake_session(*_args, **_kwargs):
+        yield backend
+
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.streamable_http_client", fake_transport)
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.ClientSession", fake_session)
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        async with bridge._connect_backend(None):
+            await asyncio.sleep(0)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        gc.collect()
+
+    assert "never retrieved" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_list_calls_require_connected_backend(bridge: RecafMcpBridge):
+
+    with pytest.raises(RuntimeError, match="Backend not connected"):
+        await bridge._list_tools()
+    with pytest.raises(RuntimeError, match="Backend not connected"):
+        await bridge._list_resources()
+
+
+@pytest.mark.asyncio
+async def test_server_list_handlers_reuse_cached_responses(bridge: RecafMcpBridge):
+    tool = Tool(name="class-list", inputSchema={"type": "object"})
+    resource = Resource(name="classes", uri="recaf://classes")
+    backend = FakeBackend(tools=[tool], resources=[resource])
+    bridge._set_backend(backend)
+
+    list_tools = bridge.server.request_handlers[ListToolsRequest]
+    list_resources = bridge.server.request_handlers[ListResourcesRequest]
+    tools_result = await list_tools(ListToolsRequest(method="tools/list"))
+    resources_result = await list_resources(ListResourcesRequest(method="resources/list"))
+
+    assert tools_result.root.tools == [tool]
+    assert resources_result.root.resources == [resource]
+    again_tools = await list_tools(ListToolsRequest(method="tools/list"))
+    again_resources = await list_resources(ListResourcesRequest(method="resources/list"))
+    assert again_tools.root is tools_result.root
+    assert again_resources.root is resources_result.root
+    assert backend.list_tools_calls == 1
+    assert backend.list_resources_calls == 1
+
+    await bridge._handle_backend_message(ServerNotification(ToolListChangedNotification()))
+    refreshed = await list_tools(ListToolsRequest(method="tools/list"))
+    assert refreshed.root is not tools_result.root
+    assert refreshed.root.tools == [tool]
+    assert backend.list_tools_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_zero_metadata_cache_ttl_disables_cache(monkeypatch: pytest.MonkeyPatch):
+    bridge = RecafMcpBridge(metadata_cache_ttl=0)
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
+    bridge._set_backend(backend)
+
+    now = 500_000_000_000
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.time.monotonic_ns", lambda: now)
+
+    await bridge._list_tools()
+    await bridge._list_tools()
+    assert backend.list_tools_calls == 2
+
+
+@pytest.mark.parametrize("ttl", [-1, float("inf"), float("nan")])
+def test_invalid_metadata_cache_ttl_is_rejected(ttl):
+    with pytest.raises(ValueError, match="metadata_cache_ttl"):
+        RecafMcpBridge(metadata_cache_ttl=ttl)
+
+
+@pytest.mark.asyncio
+async def test_server_list_handlers_fetch_once_per_request_without_cache():
+    bridge = RecafMcpBridge(metadata_cache_ttl=0)
+    tool = Tool(name="class-list", inputSchema={"type": "object"})
+    resource = Resource(name="classes", uri="recaf://classes")
+    backend = FakeBackend(tools=[tool], resources=[resource])
+    bridge._set_backend(backend)
+
+    list_tools = bridge.server.request_handlers[ListToolsRequest]
+    list_resources = bridge.server.request_handlers[ListResourcesRequest]
+    for calls in (1, 2, 3):
+        tools_result = await list_tools(ListToolsRequest(method="tools/list"))
+        resources_result = await list_resources(ListResourcesRequest(method="resources/list"))
+        assert tools_result.root.tools == [tool]
+        assert resources_result.root.resources == [resource]
+        assert backend.list_tools_calls == calls
+        assert backend.list_resources_calls == calls
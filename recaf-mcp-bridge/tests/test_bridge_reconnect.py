@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from fakes import FakeBackend, TOOL_A
+from recaf_mcp_bridge.bridge import RecafMcpBridge
+
+
+@pytest.mark.asyncio
+async def test_reconnect_loop_retries_after_backend_loss(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    attempts = []
+    drop = asyncio.Event()
+
+    async def transport():
+        await drop.wait()
+        raise ConnectionError("stream closed")
+
+    @contextlib.asynccontextmanager
+    async def fake_connect(_self, _http_client):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ConnectionError("recaf not up yet")
+        # Like the real transport, a dropped stream fails a task in the connection's task group.
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(transport())
+            bridge._set_backend(FakeBackend(tools=[], resources=[]))
+            try:
+                yield bridge.backend
+            finally:
+                bridge._set_backend(None)
+
+    real_sleep = asyncio.sleep
+
+    async def no_sleep(_delay):
+        await real_sleep(0)
+
+    monkeypatch.setattr(RecafMcpBridge, "_connect_backend", fake_connect)
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.asyncio.sleep", no_sleep)
+
+    maintainer = asyncio.create_task(bridge._maintain_backend(None))
+    for _ in range(100):
+        if bridge.backend is not None:
+            break
+        await real_sleep(0)
+    assert bridge.backend is not None
+
+    drop.set()
+    for _ in range(100):
+        if len(attempts) == 3:
+            break
+        await real_sleep(0)
+    maintainer.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await maintainer
+    # Shutdown wins even when the cancel lands while a connection's task group is failing.
+    assert maintainer.cancelled()
+    assert len(attempts) == 3
+    assert bridge.backend is None
+
+
+@pytest.mark.asyncio
+async def test_reconnect_loop_replaces_terminated_session(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    terminated = McpError(ErrorData(code=32600, message="Session terminated"))
+    backends = []
+
+    @contextlib.asynccontextmanager
+    async def fake_connect(_self, _http_client):
+        backend = FakeBackend(tools=[TOOL_A], resources=[])
+        backends.append(backend)
+        bridge._set_backend(backend)
+        try:
+            yield backend
+        finally:
+            bridge._set_backend(None)
+
+    real_sleep = asyncio.sleep
+
+    async def no_sleep(_delay):
+        await real_sleep(0)
+
+    monkeypatch.setattr(RecafMcpBridge, "_connect_backend", fake_connect)
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.asyncio.sleep", no_sleep)
+
+    async def wait_for_session(count):
+        for _ in range(100):
+            if len(backends) == count and bridge.backend is backends[-1]:
+                return
+            await real_sleep(0)
+        raise AssertionError(f"expected session {count}")
+
+    maintainer = asyncio.create_task(bridge._maintain_backend(None))
+    try:
+        await wait_for_session(1)
+
+        # Recaf restarted: the transport is fine but every request on the old session gets a 404.
+        async def list_tools_terminated():
+            raise terminated
+
+        backends[0].list_tools = list_tools_terminated
+        with pytest.raises(McpError):
+            await bridge._list_tools()
+        await wait_for_session(2)
+        assert await bridge._list_tools() == (TOOL_A,)
+
+        async def call_tool_terminated(_name, _arguments):
+            raise terminated
+
+        backends[1].call_tool = call_tool_terminated
+        with pytest.raises(McpError):
+            await bridge._dispatch(bridge.backend.call_tool, "tool-a", {})
+        await wait_for_session(3)
+
+        # Other backend errors leave the session alone.
+        async def call_tool_invalid(_name, _arguments):
+            raise McpError(ErrorData(code=-32602, message="Invalid params"))
+
+        backends[2].call_tool = call_tool_invalid
+        with pytest.raises(McpError):
+            await bridge._dispatch(bridge.backend.call_tool, "tool-a", {})
+        await real_sleep(0)
+        assert len(backends) == 3
+        assert bridge.backend is backends[2]
+    finally:
+        maintainer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await maintainer
+
+
+@pytest.mark.asyncio
+async def test_backend_message_errors_keep_session(bridge: RecafMcpBridge):
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
+    bridge._set_backend(backend)
+    await bridge._list_tools()
+
+    await bridge._handle_backend_message(RuntimeError("Received response with an unknown request ID"))
+
+    assert bridge.backend is backend
+    assert await bridge._list_tools() == (TOOL_A,)
+    assert backend.list_tools_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_connect_exposes_session_only_after_initialize(
+    bridge: RecafMcpBridge, monkeypatch: pytest.MonkeyPatch
+):
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
+    seen_during_initialize = []
+    real_initialize = backend.initialize
+
+    async def initialize():
+        seen_during_initialize.append(bridge.backend)
+        return await real_initialize()
+
+    backend.initialize = initialize
+
+    @contextlib.asynccontextmanager
+    async def fake_transport(_url, **_kwargs):
+        yield None, None, None
+
+    @contextlib.asynccontextmanager
+    async def fake_session(*_args, **_kwargs):
+        yield backend
+
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.streamable_http_client", fake_transport)
+    monkeypatch.setattr("recaf_mcp_bridge.bridge.ClientSession", fake_session)
+
+    async with bridge._connect_backend(None):
+        assert bridge.backend is backend
+
+    assert seen_during_initialize == [None]
+    assert bridge.backend is None
+
+
+@pytest.mark.asyncio
+async def test_connection_teardown_fails_in_flight_backend_calls(bridge: RecafMcpBridge):
+    backend = FakeBackend(tools=[TOOL_A], resources=[])
+    backend.release.clear()
+    call_started = asyncio.Event()
+    call_cancelled = asyncio.Event()
+
+    async def call_tool(_name, _arguments):
+        call_started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            call_cancelled.set()
+            raise
+
+    backend.call_tool = call_tool
+    bridge._set_backend(backend)
+
+    call = asyncio.create_task(bridge._dispatch(backend.call_tool, "tool-a", {}))
+    listing = asyncio.create_task(bridge._list_tools())
+    await call_started.wait()
+
+    # The connection goes away with both requests still waiting on the old session.
+    bridge._set_backend(None)
+
+    with pytest.raises(RuntimeError, match="Backend connection lost"):
+        await asyncio.wait_for(call, 1)
+    with pytest.raises(RuntimeError, match="Backend connection lost"):
+        await asyncio.wait_for(listing, 1)
+    assert call_cancelled.is_set()
+    assert not bridge._backend_tasks
+    assert not bridge._dispatch_slots.locked()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_run_serves_stdio_while_recaf_is_down(monkeypatch: pytest.MonkeyPatch):
+    bridge = RecafMcpBridge(reconnect=True)
+    served_while = []
+
+    @contextlib.asynccontextmanager
+    async def fake_connect(_self, _http_client):
+        raise ConnectionError("recaf not up yet")
+        yield
+
+    async def fake_serve_stdio(_self):
+        served_while.append(bridge.backend)
+        with pytest.raises(RuntimeError, match="Backend not connected"):
+            await bridge._list_tools()
+
+    monkeypatch.setattr(RecafMcpBridge, "_connect_backend", fake_connect)
+    monkeypatch.setattr(RecafMcpBridge, "_serve_stdio", fake_serve_stdio)
+
+    await asyncio.wait_for(bridge.run(), 1)
+
+    assert served_while == [None]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from recaf_mcp_bridge.bridge import _StdoutFrameWriter
+
+
+@pytest.mark.asyncio
+async def test_stdout_frame_writer_flushes_each_write():
+    class RecordingStream(io.StringIO):
+        flushes = 0
+
+        def flush(self):
+            self.flushes += 1
+            super().flush()
+
+    stream = RecordingStream()
+    writer = _StdoutFrameWriter(stream)
+
+    await writer.write('{"jsonrpc":"2.0"}\n')
+    await writer.flush()
+
+    assert stream.getvalue() == '{"jsonrpc":"2.0"}\n'
+    assert stream.flushes == 1